@@ -1,17 +1,53 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from collections import deque
 import image_processing
+import slow_requests
 import numpy as np
 import cv2
 import base64
+import json
+import os
+import threading
 
 app = Flask(__name__)
 CORS(app)
 
+# Per-endpoint latency budgets in seconds (decode, analysis and overlay), overridable with
+# <ENDPOINT>_BUDGET environment variables, e.g. PROCESS_IMAGE_BUDGET=5; 0 disables the budget
+LATENCY_BUDGETS = {
+    'process_image': float(os.environ.get('PROCESS_IMAGE_BUDGET', 10)),
+}
+LATENCY_HISTORY = 1000  # Number of recent requests kept per endpoint for /metrics
+
+_latencies = {}
+_latencies_lock = threading.Lock()
+
+def request_deadline(endpoint):
+    """Start the latency budget for a request to the given endpoint."""
+    budget = LATENCY_BUDGETS.get(endpoint)
+    return image_processing.Deadline(budget if budget else None)
+
+def record_latency(endpoint, seconds, degraded):
+    """Remember the achieved latency of a request for /metrics."""
+    with _latencies_lock:
+        _latencies.setdefault(endpoint, deque(maxlen=LATENCY_HISTORY)).append((seconds, degraded))
+
+def finish_request(file_bytes, filename, deadline, trace, suture_analysis, overlay_scale):
+    """Record the latency of a /process_image request; slow ones are also recorded for replay in the background."""
+    latency = deadline.elapsed()
+    degraded = bool(suture_analysis.get('degraded', False)) or overlay_scale < 1.0
+    record_latency('process_image', latency, degraded)
+    slow_requests.maybe_record(file_bytes, filename, latency, trace, suture_analysis,
+                               budget=LATENCY_BUDGETS.get('process_image'))
+
 @app.route('/process_image', methods=['POST'])
 def process_image():
+    deadline = request_deadline('process_image')
+    trace = image_processing.PipelineTrace()
+    
     if 'image' not in request.files:
         return jsonify({'error': 'No image part in the request'}), 400
     
@@ -26,51 +62,94 @@ def process_image():
     
     # Convert from BGR to RGB (OpenCV loads as BGR, but our processor expects RGB)
     original_image = cv2.cvtColor(original_image_bgr, cv2.COLOR_BGR2RGB)
+    trace.mark('decode')
     
     # Process image directly (you'll need to modify analyze_image() to accept an image array)
-    _, original_image, suture_analysis = image_processing.analyze_image(original_image)
-    
-    # Create visualization image with analysis results
-    if "error" not in suture_analysis:
-        # Generate visualization
-        visualized = image_processing.visualize_suture_analysis(original_image, suture_analysis)
-        
-        # Convert directly to base64
-        visualized_bgr = cv2.cvtColor(visualized, cv2.COLOR_RGB2BGR)
-        _, buffer = cv2.imencode('.png', visualized_bgr)
-        result_base64 = base64.b64encode(buffer).decode('utf-8')
-    else:
-        result_base64 = None
+    _, original_image, suture_analysis = image_processing.analyze_image(original_image, deadline=deadline,
+                                                                        trace=trace)
     
-    # Create response data
+    # Create response data (the analysis serializes itself straight to JSON bytes)
     response = {
         'timestamp': datetime.now().isoformat(),
         'original_filename': secure_filename(file.filename),
-        'result_image_base64': result_base64,
-        'suture_analysis': sanitize_for_json(suture_analysis),
+        'suture_analysis': suture_analysis.to_json_bytes(),
     }
     
-    return jsonify(response), 200
+    # Streaming mode: send the analysis as soon as it is ready and the overlay after it
+    if wants_stream():
+        def generate():
+            yield json_object({'type': 'analysis', **response}) + b'\n'
+            overlay_scale = image_processing.choose_overlay_scale(original_image, deadline.remaining())
+            result_base64 = encode_visualization(original_image, suture_analysis, overlay_scale)
+            yield json_object({'type': 'image', 'result_image_base64': result_base64,
+                               'result_image_scale': overlay_scale}) + b'\n'
+            trace.mark('encode_visualization')
+            finish_request(file_bytes, secure_filename(file.filename), deadline, trace, suture_analysis,
+                           overlay_scale)
+        
+        return Response(generate(), mimetype='application/x-ndjson'), 200
+    
+    # Render the overlay at the largest resolution that fits the time left
+    overlay_scale = image_processing.choose_overlay_scale(original_image, deadline.remaining())
+    response['result_image_base64'] = encode_visualization(original_image, suture_analysis, overlay_scale)
+    response['result_image_scale'] = overlay_scale
+    trace.mark('encode_visualization')
+    finish_request(file_bytes, secure_filename(file.filename), deadline, trace, suture_analysis, overlay_scale)
+    return Response(json_object(response), mimetype='application/json'), 200
+
+def wants_stream():
+    """Check whether the client asked for the NDJSON streaming response."""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'ndjson'):
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+def encode_visualization(original_image, suture_analysis, scale=1.0):
+    """Render the analysis overlay at the given scale as a base64 PNG JSON string (bytes), or JSON null on analysis error."""
+    if "error" in suture_analysis:
+        return b'null'
+    
+    # Generate visualization
+    visualized = image_processing.visualize_suture_analysis(original_image, suture_analysis, scale=scale)
+    
+    # Convert directly to base64; the alphabet needs no JSON escaping
+    visualized_bgr = cv2.cvtColor(visualized, cv2.COLOR_RGB2BGR)
+    _, buffer = cv2.imencode('.png', visualized_bgr)
+    return b'"' + base64.b64encode(buffer) + b'"'
 
-# Add a helper function to sanitize objects for JSON serialization
-def sanitize_for_json(obj):
-    """Convert any non-JSON serializable objects to serializable types."""
-    if isinstance(obj, dict):
-        return {k: sanitize_for_json(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [sanitize_for_json(item) for item in obj]
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, (np.integer, np.int64, np.int32, np.int16, np.int8)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, np.float64, np.float32, np.float16)):
-        return float(obj)
-    elif isinstance(obj, np.bool_):
-        return bool(obj)
-    elif isinstance(obj, tuple):
-        return tuple(sanitize_for_json(item) for item in obj)
-    else:
-        return obj
+def json_object(fields):
+    """Build a JSON object from plain values and already serialized JSON values (bytes)."""
+    parts = []
+    for key, value in fields.items():
+        if not isinstance(value, bytes):
+            value = json.dumps(value).encode('utf-8')
+        parts.append(json.dumps(key).encode('utf-8') + b':' + value)
+    return b'{' + b','.join(parts) + b'}'
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Report achieved latencies per endpoint over the recent request history."""
+    with _latencies_lock:
+        snapshot = {endpoint: list(samples) for endpoint, samples in _latencies.items()}
+    
+    report = {}
+    for endpoint, budget in LATENCY_BUDGETS.items():
+        samples = snapshot.get(endpoint, [])
+        latencies = np.array([seconds for seconds, _ in samples])
+        report[endpoint] = {
+            'budget_seconds': budget or None,
+            'requests': len(samples),
+            'degraded': sum(1 for _, degraded in samples if degraded),
+            'over_budget': int(np.sum(latencies > budget)) if budget else 0,
+        }
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            report[endpoint].update({
+                'p50_seconds': float(p50),
+                'p90_seconds': float(p90),
+                'p99_seconds': float(p99),
+                'max_seconds': float(latencies.max()),
+            })
+    return jsonify(report), 200
 
 @app.route('/', methods=['GET'])
 def index():
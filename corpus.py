@@ -0,0 +1,225 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import multiprocessing
+import os
+import struct
+import time
+
+import numpy as np
+
+import image_processing
+
+# ------ CONFIGURATION PARAMETERS - MODIFY THESE VALUES AS NEEDED ------
+SAMPLE_PATTERNS = ["image*.jpg", "urban.jpg"] # Images packed when no inputs are given
+DEFAULT_CORPUS_PATH = "samples.corpus"
+BENCH_REPEAT = 3                              # Analysis runs per image in the benchmark
+# -------------------------------------------------------------------
+
+# File layout: header, page-aligned raw RGB arrays, JSON index at the end
+CORPUS_MAGIC = b"SUTCORP1"
+_HEADER = struct.Struct("<8sQQ")  # magic, index offset, index length
+PAGE_SIZE = 4096
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _align(offset, alignment=PAGE_SIZE):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def pack_corpus(image_paths, output_path):
+    """
+    Decode images once and store them as raw RGB arrays in a single corpus file.
+
+    Args:
+        image_paths (list): Paths of the images to pack
+        output_path (str): Path of the corpus file to write
+
+    Returns:
+        list: Index entries (name, shape, dtype, offset, decode_seconds)
+
+    Raises:
+        ValueError: If two images share a file name; entries are looked up by name
+    """
+    names = [os.path.basename(path) for path in image_paths]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate image names in corpus: {', '.join(duplicates)}")
+
+    index = []
+    with open(output_path, "wb") as f:
+        # Reserve the header; it is filled in once the index position is known
+        f.write(b"\0" * PAGE_SIZE)
+        offset = PAGE_SIZE
+
+        for path in image_paths:
+            start = time.perf_counter()
+            image = np.ascontiguousarray(image_processing.load_image(path))
+            decode_seconds = time.perf_counter() - start
+
+            f.seek(offset)
+            f.write(image.tobytes())
+            index.append({
+                "name": os.path.basename(path),
+                "shape": list(image.shape),
+                "dtype": image.dtype.str,
+                "offset": offset,
+                "decode_seconds": decode_seconds,
+            })
+            offset = _align(offset + image.nbytes)
+
+        index_bytes = json.dumps(index).encode("utf-8")
+        f.seek(offset)
+        f.write(index_bytes)
+        f.seek(0)
+        f.write(_HEADER.pack(CORPUS_MAGIC, offset, len(index_bytes)))
+    return index
+
+
+class ImageCorpus:
+    """
+    Read-only, memory-mapped view of a corpus written by pack_corpus.
+
+    Images are returned as zero-copy views into the mapping, so repeated reads
+    (and worker processes opening the same file) are served from the page cache.
+
+    Args:
+        path (str): Path of the corpus file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Plain ndarray view of the mapping, so slices are ordinary read-only arrays
+        self._data = np.memmap(path, dtype=np.uint8, mode="r").view(np.ndarray)
+
+        magic, index_offset, index_length = _HEADER.unpack_from(self._data)
+        if magic != CORPUS_MAGIC:
+            raise ValueError(f"{path} is not an image corpus")
+        index = json.loads(self._data[index_offset:index_offset + index_length].tobytes())
+        self._entries = {entry["name"]: entry for entry in index}
+
+    @property
+    def names(self):
+        return list(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __getitem__(self, name):
+        """Return the RGB image as a read-only view into the mapped file."""
+        entry = self._entries[name]
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"]))
+        start = entry["offset"]
+        end = start + count * dtype.itemsize
+        return self._data[start:end].view(dtype).reshape(entry["shape"])
+
+    def __iter__(self):
+        for name in self._entries:
+            yield name, self[name]
+
+    def decode_seconds(self, name):
+        """Time it took to decode the image when the corpus was packed."""
+        return self._entries[name]["decode_seconds"]
+
+
+def _analyze_quietly(image):
+    # The pipeline reports every stage on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        return image_processing.analyze_image(image)
+
+
+_worker_corpus = None
+
+
+def _init_worker(path):
+    global _worker_corpus
+    _worker_corpus = ImageCorpus(path)
+
+
+def _bench_one(args):
+    name, repeat = args
+    image = _worker_corpus[name]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _, _, analysis = _analyze_quietly(image)
+        timings.append(time.perf_counter() - start)
+    return name, timings, analysis.get("sutures_detected")
+
+
+def bench_corpus(path, repeat=BENCH_REPEAT, workers=1):
+    """
+    Run analyze_image over every image in a corpus and report per-image timings.
+
+    Args:
+        path (str): Corpus file
+        repeat (int): Analysis runs per image
+        workers (int): Worker processes sharing the mapped corpus
+
+    Returns:
+        list: (name, timings, sutures_detected) per image
+    """
+    corpus = ImageCorpus(path)
+    jobs = [(name, repeat) for name in corpus.names]
+
+    if workers > 1:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(path,)) as pool:
+            results = pool.map(_bench_one, jobs)
+    else:
+        _init_worker(path)
+        results = [_bench_one(job) for job in jobs]
+
+    print(f"{'image':>14} {'decode s':>9} {'median s':>9} {'min s':>7} {'sutures':>8}")
+    for name, timings, sutures in results:
+        print(f"{name:>14} {corpus.decode_seconds(name):>9.3f} {np.median(timings):>9.3f} "
+              f"{min(timings):>7.3f} {sutures if sutures is not None else '-':>8}")
+    total = sum(np.median(timings) for _, timings, _ in results)
+    print(f"Total median analysis time: {total:.2f}s over {len(results)} images")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack sample images into a memory-mapped corpus "
+                                                 "and benchmark the pipeline on it.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack = commands.add_parser("pack", help="Decode images into a corpus file")
+    pack.add_argument("images", nargs="*", help="Images to pack (default: bundled samples)")
+    pack.add_argument("-o", "--output", default=DEFAULT_CORPUS_PATH)
+
+    listing = commands.add_parser("list", help="Show the images in a corpus")
+    listing.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS_PATH)
+
+    bench = commands.add_parser("bench", help="Time analyze_image on every image in a corpus")
+    bench.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS_PATH)
+    bench.add_argument("--repeat", type=int, default=BENCH_REPEAT)
+    bench.add_argument("--workers", type=int, default=1, help="Worker processes sharing the corpus")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        images = args.images
+        if not images:
+            images = sorted({path for pattern in SAMPLE_PATTERNS
+                             for path in glob.glob(os.path.join(BASE_DIR, pattern))})
+        index = pack_corpus(images, args.output)
+        decode = sum(entry["decode_seconds"] for entry in index)
+        print(f"Packed {len(index)} images into {args.output} "
+              f"({os.path.getsize(args.output) / 1e6:.0f} MB, {decode:.2f}s of decoding saved per pass)")
+    elif args.command == "list":
+        corpus = ImageCorpus(args.corpus)
+        for name, image in corpus:
+            print(f"{name:>14} {image.shape} {image.dtype}")
+    elif args.command == "bench":
+        bench_corpus(args.corpus, repeat=args.repeat, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
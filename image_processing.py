@@ -1,6 +1,11 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 import matplotlib.pyplot as plt
+from suture_result import SutureAnalysis
 
 # ------ CONFIGURATION PARAMETERS - MODIFY THESE VALUES AS NEEDED ------
 # Input/output settings
@@ -25,6 +30,29 @@ ANGLE_THRESHOLD = 10.0                       # Maximum allowed deviation in degr
 # Line proximity filtering
 PROXIMITY_THRESHOLD = 20        # Minimum distance (in pixels) between parallel lines to be considered separate
 KEEP_BEST_BY_LENGTH = False     # True to keep longer lines, False to keep lines with better angle
+
+# Region of interest
+USE_ROI = True                  # Crop to the suture-coloured area before full-resolution processing
+ROI_MAX_SIDE = 1024              # Longest side of the low-resolution pass used to locate the ROI
+ROI_MARGIN = 64                 # Margin (in full-resolution pixels) added around the detected ROI
+ROI_MIN_AREA = 40               # Preview specks smaller than this (in full-resolution pixels) are ignored
+
+# Parallelism
+REGION_WORKERS = int(os.environ.get("REGION_WORKERS", 1))  # Threads for the per-region stages (1 = sequential)
+
+# Latency budget (used when a Deadline is passed to extract_suture_mask)
+# Only scales whose suture counts match full resolution on the bundled samples belong here.
+# 1/2 and 1/4 resolution lose thin sutures in line detection (e.g. 6 -> 2 on image.jpg,
+# 11 -> 2 on urban.jpg) whatever the kernels and Hough parameters, so none are enabled.
+# Use integer downscale factors only: INTER_AREA is several times slower for fractional ones.
+PROCESSING_SCALES = (1.0,)      # Resolutions tried, largest first, until the estimate fits
+BUDGET_SAFETY = 0.8             # Fraction of the remaining budget the cost estimate may use
+# Calibrated on full extract_suture_mask runs after the preview pass (bundled samples, 1 CPU)
+INPUT_COST_PER_PIXEL = 3e-9     # Seconds per input pixel for resizing in and out and the final darkening
+MASK_COST_PER_PIXEL = 2e-8      # Seconds per ROI pixel for masking, morphology and line detection
+LINE_COST_PER_MASK_PIXEL = 4e-7  # Seconds per suture pixel for region selection and association
+OVERLAY_SCALES = (1.0, 0.5, 0.25)  # Overlay resolutions tried, largest first, with the time left after analysis
+OVERLAY_COST_PER_PIXEL = 8e-8   # Seconds per overlay pixel for drawing, PNG encoding and base64
 # -------------------------------------------------------------------
 
 
@@ -94,6 +122,243 @@ def extract_sutures(image, saturation_threshold=SATURATION_THRESHOLD,
     return mask
 
 
+def _preview_mask(image, max_side=ROI_MAX_SIDE):
+    """
+    Compute the suture colour mask on a low-resolution copy of the image.
+    
+    Args:
+        image (numpy.ndarray): Input RGB image
+        max_side (int): Longest side of the downscaled image
+        
+    Returns:
+        tuple: (mask, scale) where scale maps full-resolution to preview pixels
+    """
+    height, width = image.shape[:2]
+    scale = min(1.0, max_side / max(height, width))
+    if scale < 1.0:
+        # Nearest-neighbour sampling keeps thin sutures at full colour instead of blending them away
+        small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST)
+    else:
+        small = image
+    
+    # Same colour criteria as the full-resolution masks
+    mask = cv2.bitwise_or(extract_sutures(small), compute_dominance(small))
+    
+    # Drop isolated specks, so a few stray pixels cannot stretch the ROI across the frame
+    # (never above MIN_SIZE: smaller components are discarded at full resolution anyway)
+    min_area = min(MIN_SIZE, ROI_MIN_AREA * scale ** 2)
+    _, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    specks = stats[:, cv2.CC_STAT_AREA] < min_area
+    specks[0] = False  # Background
+    if specks.any():
+        mask[specks[labels]] = 0
+    return mask, scale
+
+
+def locate_suture_roi(image, max_side=ROI_MAX_SIDE, margin=ROI_MARGIN, preview=None):
+    """
+    Locate the area containing suture-coloured structures on a low-resolution pass.
+    
+    Args:
+        image (numpy.ndarray): Input RGB image
+        max_side (int): Longest side of the downscaled image used for the search
+        margin (int): Margin in full-resolution pixels added around the found area
+        preview (tuple, optional): (mask, scale) from _preview_mask, to reuse an existing pass
+        
+    Returns:
+        tuple: (x0, y0, x1, y1) bounds in full-resolution pixels, or None if nothing was found
+    """
+    height, width = image.shape[:2]
+    mask, scale = preview if preview is not None else _preview_mask(image, max_side)
+    points = cv2.findNonZero(mask)
+    if points is None:
+        return None
+    x, y, w, h = cv2.boundingRect(points)
+    
+    # Map back to full resolution, padding by one low-resolution pixel plus the margin
+    pad = margin + int(np.ceil(1 / scale))
+    x0 = max(0, int(x / scale) - pad)
+    y0 = max(0, int(y / scale) - pad)
+    x1 = min(width, int((x + w) / scale) + pad)
+    y1 = min(height, int((y + h) / scale) + pad)
+    return x0, y0, x1, y1
+
+
+class Deadline:
+    """
+    Wall-clock latency budget for one pipeline run.
+    
+    Args:
+        budget (float): Seconds available from construction, or None for no limit
+    """
+    
+    def __init__(self, budget):
+        self.budget = budget
+        self.start = time.perf_counter()
+    
+    def elapsed(self):
+        return time.perf_counter() - self.start
+    
+    def remaining(self):
+        if self.budget is None:
+            return float("inf")
+        return self.budget - self.elapsed()
+
+
+class PipelineTrace:
+    """
+    Per-stage timings and intermediate counts of one pipeline run.
+    
+    Each call to mark() records the time since the previous mark under the given stage name.
+    """
+    
+    def __init__(self):
+        self.stages = []
+        self.counts = {}
+        self._last = time.perf_counter()
+    
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+    
+    def count(self, name, value):
+        self.counts[name] = int(value)
+    
+    def to_dict(self):
+        return {"stages": [[stage, seconds] for stage, seconds in self.stages], "counts": dict(self.counts)}
+
+
+def measure_suture_extent(image, preview=None):
+    """
+    Measure the ROI size and suture mask area on a low-resolution pass.
+    
+    Args:
+        image (numpy.ndarray): Input RGB image
+        preview (tuple, optional): (mask, scale) from _preview_mask, to reuse an existing pass
+        
+    Returns:
+        tuple: (roi_pixels, mask_pixels) in full-resolution pixels
+    """
+    mask, scale = preview if preview is not None else _preview_mask(image)
+    points = cv2.findNonZero(mask)
+    if points is None:
+        return 0, 0
+    _, _, w, h = cv2.boundingRect(points)
+    return w * h / scale ** 2, len(points) / scale ** 2
+
+
+def estimate_processing_cost(image_pixels, roi_pixels, mask_pixels, scale=1.0):
+    """
+    Estimate the run time of extract_suture_mask after the preview pass.
+    
+    Args:
+        image_pixels (int): Pixels in the input image
+        roi_pixels (float): Pixels in the suture ROI at full resolution
+        mask_pixels (float): Suture-coloured pixels at full resolution
+        scale (float): Processing resolution relative to the input
+        
+    Returns:
+        float: Estimated seconds for the whole pipeline at that scale
+    """
+    # The input-sized work is paid at every scale; the rest shrinks with the square of the scale
+    fixed = INPUT_COST_PER_PIXEL * image_pixels
+    return fixed + (MASK_COST_PER_PIXEL * roi_pixels + LINE_COST_PER_MASK_PIXEL * mask_pixels) * scale ** 2
+
+
+def choose_processing_scale(image, budget, scales=PROCESSING_SCALES, preview=None):
+    """
+    Pick the largest processing resolution whose estimated cost fits the budget.
+    
+    Args:
+        image (numpy.ndarray): Input RGB image
+        budget (float): Seconds available for the pipeline
+        scales (tuple): Candidate scales, largest first
+        preview (tuple, optional): (mask, scale) from _preview_mask, to reuse an existing pass
+        
+    Returns:
+        float: Chosen scale (the smallest candidate if none fits)
+    """
+    image_pixels = image.shape[0] * image.shape[1]
+    roi_pixels, mask_pixels = measure_suture_extent(image, preview=preview)
+    for scale in scales:
+        if estimate_processing_cost(image_pixels, roi_pixels, mask_pixels, scale) <= budget * BUDGET_SAFETY:
+            return scale
+    return scales[-1]
+
+
+def estimate_overlay_cost(image_pixels, scale=1.0):
+    """
+    Estimate the time to render, PNG-encode and base64-encode the analysis overlay.
+    
+    Args:
+        image_pixels (int): Pixels in the input image
+        scale (float): Overlay resolution relative to the input
+        
+    Returns:
+        float: Estimated seconds
+    """
+    cost = OVERLAY_COST_PER_PIXEL * image_pixels * scale ** 2
+    if scale < 1.0:
+        cost += INPUT_COST_PER_PIXEL * image_pixels  # Downscaling the input first
+    return cost
+
+
+def choose_overlay_scale(image, budget, scales=OVERLAY_SCALES):
+    """
+    Pick the largest overlay resolution whose estimated cost fits the budget.
+    
+    Args:
+        image (numpy.ndarray): Input RGB image
+        budget (float): Seconds left for the overlay
+        scales (tuple): Candidate scales, largest first
+        
+    Returns:
+        float: Chosen scale (the smallest candidate if none fits)
+    """
+    image_pixels = image.shape[0] * image.shape[1]
+    for scale in scales:
+        if estimate_overlay_cost(image_pixels, scale) <= budget * BUDGET_SAFETY:
+            return scale
+    return scales[-1]
+
+
+def offset_lines(suture_lines, dx, dy):
+    """
+    Shift suture lines from ROI coordinates back to the original frame.
+    
+    Args:
+        suture_lines (list): List of ((x1, y1), (x2, y2), angle) tuples
+        dx (int): Horizontal offset of the ROI
+        dy (int): Vertical offset of the ROI
+        
+    Returns:
+        list: Lines in original image coordinates
+    """
+    if dx == 0 and dy == 0:
+        return suture_lines
+    return [((x1 + dx, y1 + dy), (x2 + dx, y2 + dy), angle)
+            for (x1, y1), (x2, y2), angle in suture_lines]
+
+
+def rescale_lines(suture_lines, factor):
+    """
+    Scale suture line coordinates, e.g. from a downscaled frame back to the original.
+    
+    Args:
+        suture_lines (list): List of ((x1, y1), (x2, y2), angle) tuples
+        factor (float): Multiplier applied to every coordinate
+        
+    Returns:
+        list: Rescaled lines (angles are unchanged by uniform scaling)
+    """
+    if factor == 1:
+        return suture_lines
+    return [((int(round(x1 * factor)), int(round(y1 * factor))),
+             (int(round(x2 * factor)), int(round(y2 * factor))), angle)
+            for (x1, y1), (x2, y2), angle in suture_lines]
+
+
 def compute_dominance(image):
     """
     Compute a mask where suture channel is dominant compared to red and blue.
@@ -116,7 +381,92 @@ def compute_dominance(image):
     return dominant
 
 
-def filter_by_size_and_shape(binary_mask, min_size=MIN_SIZE, max_size=MAX_SIZE, min_aspect_ratio=MIN_ASPECT_RATIO):
+# Shared by every request; created on first use so the sequential default starts no threads
+_region_executor = None
+_region_executor_lock = threading.Lock()
+
+
+def _get_region_executor(workers):
+    global _region_executor
+    with _region_executor_lock:
+        if _region_executor is None:
+            _region_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="region-worker")
+        return _region_executor
+
+
+def map_regions(func, items, workers=REGION_WORKERS):
+    """
+    Apply func to every item, optionally on a thread pool, keeping the input order.
+    
+    The items are split into one contiguous chunk per worker, so each task covers many
+    regions and the per-task overhead stays small. OpenCV releases the GIL, so the
+    chunks spread across cores.
+    
+    Args:
+        func (callable): Function applied to each item
+        items (list): Items to process (e.g. contours)
+        workers (int): Number of threads; 1 runs sequentially
+        
+    Returns:
+        list: Results in the same order as items
+    """
+    workers = min(workers, len(items))
+    if workers <= 1:
+        return [func(item) for item in items]
+    
+    def run_chunk(chunk):
+        return [func(item) for item in chunk]
+    
+    chunk_size = -(-len(items) // workers)
+    chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+    results = []
+    for chunk_results in _get_region_executor(workers).map(run_chunk, chunks):
+        results.extend(chunk_results)
+    return results
+
+
+def _is_suture_shaped(contour, min_size, max_size, min_aspect_ratio):
+    """
+    Check whether a contour has the size and elongation of a suture.
+    
+    Args:
+        contour (numpy.ndarray): Contour points
+        min_size (int): Minimum area
+        max_size (int): Maximum area
+        min_aspect_ratio (float): Minimum aspect ratio for objects larger than 100 pixels
+        
+    Returns:
+        bool: True if the contour should be kept
+    """
+    # Calculate area
+    area = cv2.contourArea(contour)
+    
+    # Filter by size
+    if area < min_size or area > max_size:
+        return False
+    
+    # Calculate shape metrics for larger objects
+    if area > 100:
+        # Calculate aspect ratio using minimum area bounding rectangle
+        rect = cv2.minAreaRect(contour)
+        width, height = rect[1]
+        
+        # Skip if dimensions are too small
+        if min(width, height) < 1:
+            return False
+            
+        # Calculate aspect ratio (longer side / shorter side)
+        aspect_ratio = max(width, height) / max(1, min(width, height))
+        
+        # Keep only elongated shapes
+        if aspect_ratio < min_aspect_ratio:
+            return False
+    
+    return True
+
+
+def filter_by_size_and_shape(binary_mask, min_size=MIN_SIZE, max_size=MAX_SIZE, min_aspect_ratio=MIN_ASPECT_RATIO,
+                             workers=REGION_WORKERS):
     """
     Filter objects by size and shape to keep only suture-like structures.
     
@@ -125,6 +475,7 @@ def filter_by_size_and_shape(binary_mask, min_size=MIN_SIZE, max_size=MAX_SIZE,
         min_size (int): Minimum size of objects to keep
         max_size (int): Maximum size of objects to keep
         min_aspect_ratio (float): Minimum aspect ratio for line-like structures
+        workers (int): Threads used to evaluate the contours
         
     Returns:
         numpy.ndarray: Filtered binary mask
@@ -135,33 +486,13 @@ def filter_by_size_and_shape(binary_mask, min_size=MIN_SIZE, max_size=MAX_SIZE,
     # Create output mask
     filtered_mask = np.zeros_like(binary_mask)
     
-    for contour in contours:
-        # Calculate area
-        area = cv2.contourArea(contour)
-        
-        # Filter by size
-        if area < min_size or area > max_size:
-            continue
-        
-        # Calculate shape metrics for larger objects
-        if area > 100:
-            # Calculate aspect ratio using minimum area bounding rectangle
-            rect = cv2.minAreaRect(contour)
-            width, height = rect[1]
-            
-            # Skip if dimensions are too small
-            if min(width, height) < 1:
-                continue
-                
-            # Calculate aspect ratio (longer side / shorter side)
-            aspect_ratio = max(width, height) / max(1, min(width, height))
-            
-            # Keep only elongated shapes
-            if aspect_ratio < min_aspect_ratio:
-                continue
-                
-        # Draw contour on output mask
-        cv2.drawContours(filtered_mask, [contour], 0, 255, -1)
+    keep = map_regions(lambda contour: _is_suture_shaped(contour, min_size, max_size, min_aspect_ratio),
+                       contours, workers)
+    
+    # Draw kept contours on output mask
+    for contour, kept in zip(contours, keep):
+        if kept:
+            cv2.drawContours(filtered_mask, [contour], 0, 255, -1)
     
     return filtered_mask
 
@@ -237,27 +568,37 @@ def detect_suture_lines(binary_mask, threshold=HOUGH_THRESHOLD,
     return suture_lines
 
 
-def visualize_suture_analysis(original_image, suture_analysis):
+def visualize_suture_analysis(original_image, suture_analysis, scale=1.0):
     """
     Visualize suture analysis results with color-coded lines and numbered labels.
     
     Args:
         original_image (numpy.ndarray): Original RGB image
         suture_analysis (dict): Analysis results from analyze_suture_quality
+        scale (float): Resolution of the returned image relative to original_image
         
     Returns:
         numpy.ndarray: Annotated image with analysis visualization
     """
     # Create a copy of the image to draw on
-    output_image = original_image.copy()
+    if scale < 1.0:
+        output_image = cv2.resize(original_image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    else:
+        output_image = original_image.copy()
     
     # If there was an error in the analysis, just return the original image
     if "error" in suture_analysis:
         return output_image
     
+    # Line and label sizes follow the overlay resolution
+    line_thickness = max(1, int(round(15 * scale)))
+    font_scale = 1.5 * scale
+    font_thickness = max(1, int(round(5 * scale)))
+    
     # Draw each suture with appropriate color and numbered label
-    print(f"Drawing {len(suture_analysis['individual_sutures'])} sutures")
-    for i, suture in enumerate(suture_analysis["individual_sutures"]):
+    sutures = suture_analysis["individual_sutures"]
+    print(f"Drawing {len(sutures)} sutures")
+    for i, suture in enumerate(sutures):
         (x1, y1), (x2, y2) = suture["line"]
         
         # Determine color based on quality
@@ -267,21 +608,22 @@ def visualize_suture_analysis(original_image, suture_analysis):
             color = (255, 0, 0)  # Red for bad
         
         # Draw the suture line
-        cv2.line(output_image, (int(x1), int(y1)), (int(x2), int(y2)), color, 15)
+        cv2.line(output_image, (int(x1 * scale), int(y1 * scale)), (int(x2 * scale), int(y2 * scale)),
+                 color, line_thickness)
 
         # Print the coordinates of the line
         print(f"Suture {i+1}: ({x1}, {y1}) to ({x2}, {y2})")
         
         # Calculate position for the label (midpoint of line, slightly offset)
-        mid_x = int((x1 + x2) / 2)
-        mid_y = int((y1 + y2) / 2)
+        mid_x = int((x1 + x2) / 2 * scale)
+        mid_y = int((y1 + y2) / 2 * scale)
         
         # Create label with suture number
         label = f"{i+1}"
         
         # Add the label text
-        cv2.putText(output_image, label, (mid_x-10, mid_y+5), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 5)
+        cv2.putText(output_image, label, (mid_x - int(10 * scale), mid_y + int(5 * scale)), 
+                   cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0, 0, 0), font_thickness)
     
     return output_image
 
@@ -465,20 +807,29 @@ def filter_nearby_lines(suture_lines, proximity_threshold=PROXIMITY_THRESHOLD, k
 def analyze_suture_quality(suture_lines, angle_threshold=ANGLE_THRESHOLD):
     """
     Analyze suture lines for parallelism and spacing.
+    
+    Args:
+        suture_lines (list): List of ((x1, y1), (x2, y2), angle) tuples
+        angle_threshold (float): Maximum allowed deviation in degrees from mean angle
+        
+    Returns:
+        SutureAnalysis: Overall assessment with per-suture columns
     """
     if len(suture_lines) < 2:
-        return {"error": "Not enough sutures detected", "sutures_detected": len(suture_lines)}
+        return SutureAnalysis.failure("Not enough sutures detected", len(suture_lines))
     
     # Sort lines by x-coordinate (left to right)
     suture_lines.sort(key=lambda line: (line[0][0] + line[1][0]) / 2)
     
-    # Extract angles
-    angles = [line[2] for line in suture_lines]
+    # Per-suture columns
+    lines = np.array([(x1, y1, x2, y2) for (x1, y1), (x2, y2), _ in suture_lines], dtype=np.int64)
+    angles = np.array([line[2] for line in suture_lines], dtype=np.float64)
+    count = len(suture_lines)
     
     # Calculate mean angle excluding first and last 10% of lines
-    if len(angles) >= 5:
-        start_idx = int(len(angles) * 0.1)
-        end_idx = int(len(angles) * 0.9)
+    if count >= 5:
+        start_idx = int(count * 0.1)
+        end_idx = int(count * 0.9)
         mean_angle = np.mean(angles[start_idx:end_idx])
         print(f"Using middle 80% of lines (indices {start_idx} to {end_idx-1}) for angle calculation")
     else:
@@ -486,78 +837,46 @@ def analyze_suture_quality(suture_lines, angle_threshold=ANGLE_THRESHOLD):
         print("Not enough lines to exclude edges, using all lines for angle calculation")
     
     # Calculate angle deviations from mean for all lines
-    angle_deviations = [abs(angle - mean_angle) for angle in angles]
+    angle_deviations = np.abs(angles - mean_angle)
+    is_parallel = angle_deviations < angle_threshold
     
-    # Calculate distances between adjacent lines
-    distances = []
-    for i in range(len(suture_lines) - 1):
-        line1 = suture_lines[i]
-        line2 = suture_lines[i + 1]
-        
-        # Calculate midpoints of each line
-        mid1 = ((line1[0][0] + line1[1][0]) / 2, (line1[0][1] + line1[1][1]) / 2)
-        mid2 = ((line2[0][0] + line2[1][0]) / 2, (line2[0][1] + line2[1][1]) / 2)
-        
-        # Calculate horizontal distance instead of vertical
-        dist = np.abs(mid2[0] - mid1[0])
-        distances.append(dist)
+    # Calculate horizontal distances between midpoints of adjacent lines
+    mid_x = (lines[:, 0] + lines[:, 2]) / 2
+    distances = np.abs(np.diff(mid_x))
     
     # Calculate statistics for distances
-    avg_distance = np.mean(distances) if distances else 0
+    avg_distance = np.mean(distances)
     
-    # Calculate spacing threshold as 10% of average distance
+    # Calculate spacing threshold as 35% of average distance
     spacing_threshold = 0.35 * avg_distance
     
     # For overall assessment, calculate if there are any large gaps
-    max_distance_deviation = max([abs(d - avg_distance) for d in distances]) if distances else 0
+    max_distance_deviation = np.max(np.abs(distances - avg_distance))
     large_gap_exists = max_distance_deviation > (0.15 * avg_distance)
     
-    # Evaluate each suture
-    suture_quality = []
-    for i, ((x1, y1), (x2, y2), angle) in enumerate(suture_lines):
-        quality = {}
-        quality["line"] = ((x1, y1), (x2, y2))
-        quality["angle"] = angle
-        quality["angle_deviation"] = angle_deviations[i]
-        quality["is_parallel"] = angle_deviations[i] < angle_threshold
-        
-        # Check distance for all but the first and last line
-        if i > 0:
-            # Get distance from previous suture
-            prev_distance = distances[i-1]
-            
-            # If we have a next suture, check for consistency with next distance
-            if i < len(suture_lines) - 1:
-                next_distance = distances[i]
-                # Consider spacing good if distances from neighbors are consistent
-                # (within the threshold of each other)
-                quality["distance_deviation"] = abs(prev_distance - next_distance)
-                quality["even_spacing"] = quality["distance_deviation"] < spacing_threshold
-            else:
-                # Last suture - check only against average since we can't compare with next
-                quality["distance_deviation"] = abs(prev_distance - avg_distance)
-                quality["even_spacing"] = quality["distance_deviation"] < spacing_threshold
-                
-            # Prioritize parallelism in overall quality assessment
-            quality["overall_good"] = quality["is_parallel"] and quality["even_spacing"]
-        else:
-            # First suture - only check angle
-            quality["overall_good"] = quality["is_parallel"]
-        
-        suture_quality.append(quality)
+    # Spacing is not evaluated for the first suture. Inner sutures are compared
+    # with the distance to the next one, the last one against the average.
+    distance_deviations = np.full(count, np.nan)
+    distance_deviations[1:-1] = np.abs(distances[:-1] - distances[1:])
+    distance_deviations[-1] = abs(distances[-1] - avg_distance)
+    even_spacing = distance_deviations < spacing_threshold
+    
+    # Prioritize parallelism in overall quality assessment
+    overall_good = is_parallel & even_spacing
+    overall_good[0] = is_parallel[0]
     
     # Overall assessment
-    overall_assessment = {
-        "parallelism": max(angle_deviations) < angle_threshold,
+    summary = {
+        "parallelism": np.max(angle_deviations) < angle_threshold,
         "even_spacing": not large_gap_exists,  # More adaptive spacing criterion
-        "sutures_detected": len(suture_lines),
+        "sutures_detected": count,
         "mean_angle": mean_angle,
         "mean_distance": avg_distance,
         "spacing_threshold": spacing_threshold,  # Add the threshold used for reference
-        "individual_sutures": suture_quality
     }
     
-    return overall_assessment
+    return SutureAnalysis(summary, lines, angles, angle_deviations, is_parallel,
+                          distance_deviations, even_spacing, overall_good)
 
 
 def calculate_average_angle(suture_lines):
@@ -618,13 +937,70 @@ def filter_by_angle_deviation(suture_lines, mean_angle, max_deviation=40):
     return filtered_lines
 
 
-def select_best_line_per_region(binary_mask, suture_lines):
+def _best_line_for_region(contour, suture_lines, line_boxes, min_size):
+    """
+    Select the longest line that touches one contour region.
+    
+    The intersection test only rasterizes the contour and each candidate line
+    inside their joint bounding box, so the work scales with the region size
+    rather than the image size.
+    
+    Args:
+        contour (numpy.ndarray): Contour of the region
+        suture_lines (list): List of detected lines
+        line_boxes (numpy.ndarray): (n, 4) array of line bounding boxes (x0, y0, x1, y1)
+        min_size (int): Minimum contour area of a region
+        
+    Returns:
+        tuple: (processed, best_line) where best_line is None if no line touches the region
+    """
+    # Skip very small contours
+    if cv2.contourArea(contour) < min_size:
+        return False, None
+    
+    # Only lines whose bounding box overlaps the contour's can intersect it
+    cx, cy, cw, ch = cv2.boundingRect(contour)
+    overlaps = ((line_boxes[:, 2] >= cx) & (line_boxes[:, 0] < cx + cw) &
+                (line_boxes[:, 3] >= cy) & (line_boxes[:, 1] < cy + ch))
+    
+    # Find which lines intersect with this contour
+    contour_lines = []
+    for index in np.flatnonzero(overlaps):
+        line = suture_lines[index]
+        (x1, y1), (x2, y2), _ = line
+        lx0, ly0, lx1, ly1 = line_boxes[index]
+        
+        # Rasterize contour and line in a window that holds both, so nothing is clipped
+        wx0, wy0 = min(cx, lx0), min(cy, ly0)
+        wx1, wy1 = max(cx + cw, lx1 + 1), max(cy + ch, ly1 + 1)
+        contour_mask = np.zeros((wy1 - wy0, wx1 - wx0), dtype=np.uint8)
+        cv2.drawContours(contour_mask, [contour], 0, 255, -1, offset=(-int(wx0), -int(wy0)))
+        
+        line_mask = np.zeros_like(contour_mask)
+        cv2.line(line_mask, (int(x1 - wx0), int(y1 - wy0)), (int(x2 - wx0), int(y2 - wy0)), 255, 1)
+        
+        # Check if line intersects with contour
+        if np.any(cv2.bitwise_and(contour_mask, line_mask)):
+            contour_lines.append(line)
+    
+    if not contour_lines:
+        return True, None
+    
+    # Select the longest line as the best representative
+    lengths = [np.sqrt((line[1][0] - line[0][0])**2 + (line[1][1] - line[0][1])**2) 
+              for line in contour_lines]
+    return True, contour_lines[np.argmax(lengths)]
+
+
+def select_best_line_per_region(binary_mask, suture_lines, min_size=MIN_SIZE, workers=REGION_WORKERS):
     """
     For each region in the mask, select the best line representing that region.
     
     Args:
         binary_mask (numpy.ndarray): Binary mask of sutures
         suture_lines (list): List of detected lines
+        min_size (int): Minimum contour area of a region
+        workers (int): Threads used to process the regions; results keep the contour order
         
     Returns:
         list: List of best representative lines
@@ -632,79 +1008,133 @@ def select_best_line_per_region(binary_mask, suture_lines):
     # Find contours in the mask
     contours, _ = cv2.findContours(binary_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     
-    best_lines = []
-    processed_contours = 0
+    # Bounding boxes of all lines, for a quick overlap test per region
+    line_boxes = np.array([(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+                           for (x1, y1), (x2, y2), _ in suture_lines], dtype=np.int64).reshape(-1, 4)
     
-    for contour in contours:
-        # Skip very small contours
-        if cv2.contourArea(contour) < MIN_SIZE:
-            continue
-            
-        processed_contours += 1
-        
-        # Create a mask for this contour only
-        contour_mask = np.zeros_like(binary_mask)
-        cv2.drawContours(contour_mask, [contour], 0, 255, -1)
-        
-        # Find which lines intersect with this contour
-        contour_lines = []
-        for line in suture_lines:
-            (x1, y1), (x2, y2), _ = line
-            
-            # Draw a line on a temporary mask
-            line_mask = np.zeros_like(binary_mask)
-            cv2.line(line_mask, (int(x1), int(y1)), (int(x2), int(y2)), 255, 1)
-            
-            # Check if line intersects with contour
-            if np.any(cv2.bitwise_and(contour_mask, line_mask)):
-                contour_lines.append(line)
-        
-        # If lines were found for this contour, select the best one
-        if contour_lines:
-            # Calculate line length
-            lengths = [np.sqrt((line[1][0] - line[0][0])**2 + (line[1][1] - line[0][1])**2) 
-                      for line in contour_lines]
-            
-            # Select the longest line as the best representative
-            best_line = contour_lines[np.argmax(lengths)]
-            best_lines.append(best_line)
+    def process(contour):
+        return _best_line_for_region(contour, suture_lines, line_boxes, min_size)
+    
+    results = map_regions(process, contours, workers)
+    
+    best_lines = [best_line for _, best_line in results if best_line is not None]
+    processed_contours = sum(1 for processed, _ in results if processed)
     
     print(f"Selected {len(best_lines)} best lines from {processed_contours} contour regions")
     return best_lines
 
 
-def extract_suture_mask(original_image):
+def extract_suture_mask(original_image, deadline=None, trace=None, scale=None):
     """
     Extract suture mask from a given image and analyze suture quality.
     
     Args:
         original_image (numpy.ndarray): Input RGB image
+        deadline (Deadline, optional): Latency budget of the request; when given, the processing
+            resolution is chosen up front so the pipeline and the smallest overlay fit it
+        trace (PipelineTrace, optional): Receives per-stage timings and intermediate counts
+        scale (float, optional): Force a processing resolution instead of deriving it from the deadline
         
     Returns:
         tuple: (mask, original_image, suture_analysis)
     """
+    degraded = False
+    if trace is None:
+        trace = PipelineTrace()
+    
+    # One low-resolution colour pass serves both the cost estimate and the ROI
+    preview = None
+    if USE_ROI or (scale is None and deadline is not None):
+        preview = _preview_mask(original_image)
+    trace.mark("preview_mask")
+    
+    # 0. Choose a processing resolution that fits the latency budget, holding back
+    # the time the smallest overlay needs (the budget covers the whole request)
+    if scale is None:
+        scale = 1.0
+        if deadline is not None:
+            overlay = estimate_overlay_cost(original_image.shape[0] * original_image.shape[1], OVERLAY_SCALES[-1])
+            scale = choose_processing_scale(original_image, deadline.remaining() - overlay, preview=preview)
+    image = original_image
+    if scale < 1.0:
+        print(f"Processing at {scale:.2f}x resolution")
+        image = cv2.resize(original_image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        degraded = True
+    trace.mark("choose_scale")
+    
+    # Size thresholds are in pixels of the processed image
+    min_size = MIN_SIZE * scale ** 2
+    max_size = MAX_SIZE * scale ** 2
+    
+    # Crop to the region containing suture-coloured structures
+    roi = locate_suture_roi(original_image, preview=preview) if USE_ROI else None
+    if roi is not None:
+        # The bounds are in input pixels; widen them to whole pixels of the processed image
+        height, width = image.shape[:2]
+        x0 = int(np.floor(roi[0] * scale))
+        y0 = int(np.floor(roi[1] * scale))
+        x1 = min(width, int(np.ceil(roi[2] * scale)))
+        y1 = min(height, int(np.ceil(roi[3] * scale)))
+        work_image = image[y0:y1, x0:x1]
+    else:
+        x0, y0 = 0, 0
+        work_image = image
+    trace.mark("locate_roi")
+    trace.count("roi_pixels", work_image.shape[0] * work_image.shape[1])
     
     # Method 1: HSV color thresholding
-    hsv_mask = extract_sutures(original_image)
+    hsv_mask = extract_sutures(work_image)
     
     # Method 2: Channel dominance
-    dominant_mask = compute_dominance(original_image)
+    dominant_mask = compute_dominance(work_image)
     
     # Combine methods
     combined_mask = cv2.bitwise_or(hsv_mask, dominant_mask)
+    trace.mark("colour_masks")
+    trace.count("colour_mask_pixels", cv2.countNonZero(combined_mask))
     
     # Filter by size and shape to keep only suture-like structures
-    filtered_mask = filter_by_size_and_shape(combined_mask)
+    filtered_mask = filter_by_size_and_shape(combined_mask, min_size=min_size, max_size=max_size,
+                                             workers=REGION_WORKERS)
+    trace.mark("filter_by_size_and_shape")
+    trace.count("filtered_mask_pixels", cv2.countNonZero(filtered_mask))
     
     # Apply post-processing
     final_mask = post_process_mask(filtered_mask)
+    trace.mark("post_process_mask")
+    
+    # Map the mask from the ROI back to the processed frame
+    if roi is not None:
+        roi_mask = final_mask
+        final_mask = np.zeros(image.shape[:2], dtype=np.uint8)
+        final_mask[y0:y1, x0:x1] = roi_mask
+    else:
+        roi_mask = final_mask
     
     # 1. Detect all suture lines using Hough transform
-    all_suture_lines = detect_suture_lines(final_mask)
+    # (on the full frame: HoughLinesP quantises rho relative to the image origin,
+    # so running it on the crop would return slightly different lines)
+    all_suture_lines = detect_suture_lines(
+        final_mask,
+        threshold=max(1, int(round(HOUGH_THRESHOLD * scale))),
+        min_line_length=MIN_LINE_LENGTH * scale,
+        max_line_gap=MAX_LINE_GAP * scale,
+    )
     print(f"Detected {len(all_suture_lines)} total lines")
+    trace.mark("detect_suture_lines")
+    trace.count("final_mask_pixels", cv2.countNonZero(roi_mask))
+    trace.count("lines_detected", len(all_suture_lines))
     
     # 2. Select best representative line for each region
-    best_lines = select_best_line_per_region(final_mask, all_suture_lines)
+    # (always over every region: raw Hough lines or a partial selection would miscount the sutures)
+    roi_lines = offset_lines(all_suture_lines, -x0, -y0)
+    best_lines = select_best_line_per_region(roi_mask, roi_lines, min_size=min_size, workers=REGION_WORKERS)
+    best_lines = offset_lines(best_lines, x0, y0)
+    
+    # Map lines back to the original resolution
+    best_lines = rescale_lines(best_lines, 1 / scale)
+    trace.mark("select_best_line_per_region")
+    trace.count("best_lines", len(best_lines))
     
     # 3. Calculate average tilt excluding 20% on both ends
     mean_angle = calculate_average_angle(best_lines)
@@ -718,6 +1148,8 @@ def extract_suture_mask(original_image):
     
     # 6. Analyze suture quality using the filtered lines
     suture_analysis = analyze_suture_quality(filtered_lines)
+    trace.mark("analyze_suture_quality")
+    trace.count("filtered_lines", len(filtered_lines))
     
     # Store the total number of detected lines in the analysis results
     if "error" not in suture_analysis:
@@ -725,27 +1157,37 @@ def extract_suture_mask(original_image):
         suture_analysis["best_lines_detected"] = len(best_lines)
         suture_analysis["filtered_lines_detected"] = len(filtered_lines)
         suture_analysis["mean_angle"] = mean_angle
+    suture_analysis["degraded"] = degraded
+    suture_analysis["processing_scale"] = scale
     
     # 7. Create visualization with ALL filtered lines
     # _ = visualize_suture_analysis(original_image, suture_analysis)
+    
+    if scale < 1.0:
+        height, width = original_image.shape[:2]
+        final_mask = cv2.resize(final_mask, (width, height), interpolation=cv2.INTER_NEAREST)
 
     # 8. Lower the brightness of the original image in rgb
     lower_brightness = cv2.convertScaleAbs(original_image, alpha=0.8, beta=0)
+    trace.mark("finish")
 
     return final_mask, lower_brightness, suture_analysis
 
 
-def analyze_image(image):
+def analyze_image(image, deadline=None, trace=None, scale=None):
     """
     Analyze an image directly from a numpy array instead of loading from disk.
     
     Args:
         image_array (numpy.ndarray): The image as a numpy array (RGB format)
+        deadline (Deadline, optional): Latency budget for the analysis
+        trace (PipelineTrace, optional): Receives per-stage timings and intermediate counts
+        scale (float, optional): Force a processing resolution (used when replaying traces)
         
     Returns:
         tuple: (mask, original_image, suture_analysis)
     """
-    mask, original_image, suture_analysis = extract_suture_mask(image)
+    mask, original_image, suture_analysis = extract_suture_mask(image, deadline=deadline, trace=trace, scale=scale)
     return mask, original_image, suture_analysis
 
 
@@ -0,0 +1,512 @@
+import argparse
+import glob
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+# ------ CONFIGURATION PARAMETERS - MODIFY THESE VALUES AS NEEDED ------
+# Server settings
+HOST = "127.0.0.1"
+PORT = 10001                                  # Port for the locally started server
+SERVER_STARTUP_TIMEOUT = 30                   # Seconds to wait for the server to come up
+
+# Load settings
+SAMPLE_PATTERNS = ["image*.jpg", "urban.jpg"] # Bundled sample uploads to replay
+CONCURRENCY_LEVELS = [1, 2, 4]                # Closed-loop concurrency levels to sweep
+REQUESTS_PER_LEVEL = 8                        # Requests sent at each level
+REQUEST_TIMEOUT = 300                         # Per-request timeout in seconds (fly.io proxy allows long uploads)
+MEMORY_SAMPLE_INTERVAL = 0.5                  # Seconds between server memory samples
+RANDOM_SEED = 0
+# -------------------------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def find_sample_images(patterns=SAMPLE_PATTERNS):
+    """
+    Collect the bundled sample images used as upload payloads.
+
+    Args:
+        patterns (list): Glob patterns relative to the repository root
+
+    Returns:
+        list: List of (filename, bytes) pairs
+    """
+    paths = []
+    for pattern in patterns:
+        paths.extend(glob.glob(os.path.join(BASE_DIR, pattern)))
+
+    samples = []
+    for path in sorted(set(paths)):
+        with open(path, "rb") as f:
+            samples.append((os.path.basename(path), f.read()))
+
+    if not samples:
+        raise FileNotFoundError(f"No sample images found for {patterns}")
+    return samples
+
+
+def shrink_samples(samples, max_side):
+    """
+    Re-encode sample images so their longest side is at most max_side pixels.
+
+    Args:
+        samples (list): List of (filename, bytes) pairs
+        max_side (int): Maximum width or height of the re-encoded image
+
+    Returns:
+        list: List of (filename, bytes) pairs
+    """
+    import cv2
+    import numpy as np
+
+    shrunk = []
+    for name, data in samples:
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        scale = max_side / max(image.shape[:2])
+        if scale < 1:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        shrunk.append((name, buffer.tobytes()))
+    return shrunk
+
+
+def encode_multipart(field_name, filename, data, content_type="image/jpeg"):
+    """
+    Build a multipart/form-data body holding a single file field.
+
+    Args:
+        field_name (str): Form field name
+        filename (str): Uploaded file name
+        data (bytes): File contents
+        content_type (str): MIME type of the file
+
+    Returns:
+        tuple: (body bytes, Content-Type header value)
+    """
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode("utf-8")
+    tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return head + data + tail, f"multipart/form-data; boundary={boundary}"
+
+
+def map_api_response(api_response):
+    """
+    Map a /process_image response the way frontend/app/api/analyze-suture/route.ts does.
+
+    Only the parts that can fail on a malformed response are reproduced, so a
+    response the frontend could not use is counted as an error here too.
+
+    Args:
+        api_response (dict): Parsed JSON body returned by the backend
+
+    Returns:
+        dict: Summary with sutureCount, score and whether an overlay was returned
+    """
+    suture_data = api_response.get("suture_analysis") or {}
+    individual_sutures = suture_data.get("individual_sutures") or []
+    suture_count = suture_data.get("sutures_detected") or len(individual_sutures) or 0
+
+    def percentage(key):
+        hits = sum(1 for s in individual_sutures if s.get(key) is True)
+        return hits / suture_count * 100 if suture_count > 0 else 0
+
+    score = 50 if suture_count > 0 else 0
+    score += round(percentage("is_parallel") / 100 * 20)
+    score += round(percentage("even_spacing") / 100 * 20)
+    score += round(percentage("overall_good") / 100 * 10)
+
+    sutures = []
+    for index, suture in enumerate(individual_sutures):
+        line = suture.get("line") or [[0, 0], [0, 0]]
+        sutures.append({"id": index, "x1": line[0][0], "y1": line[0][1],
+                        "x2": line[1][0], "y2": line[1][1]})
+
+    return {
+        "sutureCount": suture_count,
+        "sutures": sutures,
+        "score": min(100, max(0, score)),
+        "hasOverlay": bool(api_response.get("result_image_base64")),
+        "degraded": bool(suture_data.get("degraded")) or api_response.get("result_image_scale", 1.0) < 1.0,
+    }
+
+
+def analyze_suture(url, filename, data, timeout=REQUEST_TIMEOUT, stream=False):
+    """
+    Send one upload through the same call pattern as the analyze-suture route.
+
+    Args:
+        url (str): Full URL of the /process_image endpoint
+        filename (str): Name of the uploaded file
+        data (bytes): Image bytes
+        timeout (float): Request timeout in seconds
+        stream (bool): Request the NDJSON streaming response and time its first line
+
+    Returns:
+        dict: Outcome with filename, status, latency, time to first analysis,
+            response size and error
+    """
+    body, content_type = encode_multipart("image", filename, data)
+    if stream:
+        url += "?stream=1"
+    req = urllib.request.Request(url, data=body, method="POST",
+                                 headers={"Content-Type": content_type})
+
+    outcome = {"filename": filename, "upload_bytes": len(data), "start": time.time()}
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            outcome["status"] = response.status
+            if stream:
+                # Each line is a JSON object; the analysis arrives before the overlay
+                first = response.readline()
+                outcome["first_result"] = time.perf_counter() - start
+                api_response = json.loads(first)
+                payload = first
+                for line in response:
+                    payload += line
+                    api_response.update(json.loads(line))
+            else:
+                payload = response.read()
+                outcome["first_result"] = time.perf_counter() - start
+                api_response = json.loads(payload)
+        outcome["response_bytes"] = len(payload)
+        outcome["mapped"] = map_api_response(api_response)
+        outcome["error"] = None
+    except urllib.error.HTTPError as e:
+        outcome["status"] = e.code
+        outcome["error"] = f"HTTP {e.code}"
+    except Exception as e:
+        outcome["status"] = None
+        outcome["error"] = f"{type(e).__name__}: {e}"
+    outcome["latency"] = time.perf_counter() - start
+    return outcome
+
+
+def start_local_server(port=PORT):
+    """
+    Start app.py in a subprocess on localhost without the debug reloader.
+
+    Args:
+        port (int): Port to listen on
+
+    Returns:
+        subprocess.Popen: The running server process
+    """
+    cmd = [sys.executable, "-m", "flask", "--app", "app", "run",
+           "--host", HOST, "--port", str(port),
+           "--no-reload", "--no-debugger", "--with-threads"]
+    process = subprocess.Popen(cmd, cwd=BASE_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + SERVER_STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(f"http://{HOST}:{port}/", timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError(f"Server did not start within {SERVER_STARTUP_TIMEOUT}s")
+
+
+def read_rss_mb(pid):
+    """
+    Read the resident set size of a process from /proc.
+
+    Args:
+        pid (int): Process id
+
+    Returns:
+        float: RSS in megabytes, or None if it cannot be read
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemorySampler(threading.Thread):
+    """
+    Background thread that records server RSS at a fixed interval.
+    """
+
+    def __init__(self, pid, interval=MEMORY_SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            rss = read_rss_mb(self.pid)
+            if rss is not None:
+                self.samples.append((time.time(), rss))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def percentile(values, q):
+    """
+    Compute a percentile with linear interpolation.
+
+    Args:
+        values (list): Sample values
+        q (float): Percentile in the range 0-100
+
+    Returns:
+        float: The percentile value, or None for an empty list
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    lower = math.floor(pos)
+    upper = math.ceil(pos)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+def run_closed_loop(url, samples, concurrency, total_requests, rng, stream=False):
+    """
+    Keep a fixed number of uploads in flight until total_requests have been sent.
+
+    Args:
+        url (str): Endpoint URL
+        samples (list): List of (filename, bytes) pairs
+        concurrency (int): Number of concurrent clients
+        total_requests (int): Number of requests to send
+        rng (random.Random): Source of the upload mix
+        stream (bool): Use the NDJSON streaming response
+
+    Returns:
+        list: Request outcomes
+    """
+    plan = [rng.choice(samples) for _ in range(total_requests)]
+    lock = threading.Lock()
+    outcomes = []
+
+    def client():
+        while True:
+            with lock:
+                if not plan:
+                    return
+                filename, data = plan.pop()
+            outcome = analyze_suture(url, filename, data, stream=stream)
+            with lock:
+                outcomes.append(outcome)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outcomes
+
+
+def run_open_loop(url, samples, rate, total_requests, rng, stream=False):
+    """
+    Send uploads with Poisson arrivals at a fixed rate, regardless of how many are in flight.
+
+    Args:
+        url (str): Endpoint URL
+        samples (list): List of (filename, bytes) pairs
+        rate (float): Mean arrival rate in requests per second
+        total_requests (int): Number of requests to send
+        rng (random.Random): Source of the upload mix and inter-arrival times
+        stream (bool): Use the NDJSON streaming response
+
+    Returns:
+        list: Request outcomes
+    """
+    lock = threading.Lock()
+    outcomes = []
+    threads = []
+
+    def send(filename, data):
+        outcome = analyze_suture(url, filename, data, stream=stream)
+        with lock:
+            outcomes.append(outcome)
+
+    for _ in range(total_requests):
+        filename, data = rng.choice(samples)
+        t = threading.Thread(target=send, args=(filename, data))
+        t.start()
+        threads.append(t)
+        time.sleep(rng.expovariate(rate))
+
+    for t in threads:
+        t.join()
+    return outcomes
+
+
+def summarize_level(label, outcomes, elapsed, memory_samples):
+    """
+    Reduce the outcomes of one load level to a row of the capacity curve.
+
+    Args:
+        label (str): Description of the load level
+        outcomes (list): Request outcomes
+        elapsed (float): Wall-clock duration of the level in seconds
+        memory_samples (list): (timestamp, rss_mb) pairs recorded during the level
+
+    Returns:
+        dict: Summary statistics
+    """
+    latencies = [o["latency"] for o in outcomes if o["error"] is None]
+    first_results = [o["first_result"] for o in outcomes if o["error"] is None]
+    errors = [o for o in outcomes if o["error"] is not None]
+    rss = [mb for _, mb in memory_samples]
+
+    return {
+        "level": label,
+        "requests": len(outcomes),
+        "ok": len(latencies),
+        "degraded": sum(1 for o in outcomes if o["error"] is None and o["mapped"]["degraded"]),
+        "errors": len(errors),
+        "error_rate": len(errors) / len(outcomes) if outcomes else 0,
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else 0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p90": percentile(latencies, 90),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": max(latencies) if latencies else None,
+        "first_result_p50": percentile(first_results, 50),
+        "rss_peak_mb": max(rss) if rss else None,
+        "error_samples": sorted({o["error"] for o in errors})[:5],
+    }
+
+
+def print_capacity_curve(rows):
+    """
+    Print the per-level summaries as a table.
+
+    Args:
+        rows (list): Summaries from summarize_level
+    """
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "-"
+
+    print(f"{'level':>12} {'ok':>4} {'degr':>4} {'err%':>6} {'rps':>7} {'p50 s':>7} {'p90 s':>7} "
+          f"{'p99 s':>7} {'max s':>7} {'ttfr s':>7} {'rss MB':>7}")
+    for row in rows:
+        print(f"{row['level']:>12} {row['ok']:>4} {row['degraded']:>4} {row['error_rate'] * 100:>6.1f} "
+              f"{row['throughput_rps']:>7.3f} {fmt(row['latency_p50'], '7.2f')} "
+              f"{fmt(row['latency_p90'], '7.2f')} {fmt(row['latency_p99'], '7.2f')} "
+              f"{fmt(row['latency_max'], '7.2f')} {fmt(row['first_result_p50'], '7.2f')} "
+              f"{fmt(row['rss_peak_mb'], '7.0f')}")
+        for error in row["error_samples"]:
+            print(f"{'':>12}   {error}")
+
+
+def parse_levels(text, cast):
+    return [cast(part) for part in text.split(",") if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay sample uploads against /process_image and report a capacity curve.")
+    parser.add_argument("--url", help="Use an already running server instead of starting one, "
+                                      "e.g. http://127.0.0.1:10000/process_image")
+    parser.add_argument("--server-pid", type=int,
+                        help="PID of the server given by --url, for memory sampling")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--concurrency", default=",".join(map(str, CONCURRENCY_LEVELS)),
+                        help="Comma separated closed-loop concurrency levels")
+    parser.add_argument("--rate", help="Comma separated open-loop arrival rates (requests/s); "
+                                       "replaces --concurrency")
+    parser.add_argument("--requests", type=int, default=REQUESTS_PER_LEVEL,
+                        help="Requests sent at each level")
+    parser.add_argument("--max-side", type=int,
+                        help="Re-encode uploads so the longest side is at most this many pixels")
+    parser.add_argument("--stream", action="store_true",
+                        help="Request the NDJSON streaming response (analysis before overlay)")
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED)
+    parser.add_argument("--output", help="Write per-request results, memory timeline and "
+                                         "capacity curve to this JSON file")
+    args = parser.parse_args(argv)
+
+    samples = find_sample_images()
+    if args.max_side:
+        samples = shrink_samples(samples, args.max_side)
+    print(f"Loaded {len(samples)} sample uploads "
+          f"({sum(len(d) for _, d in samples) / len(samples) / 1e6:.2f} MB average)")
+
+    server = None
+    if args.url:
+        url = args.url
+        pid = args.server_pid
+    else:
+        server = start_local_server(args.port)
+        url = f"http://{HOST}:{args.port}/process_image"
+        pid = server.pid
+        print(f"Started local server (pid {pid}) at {url}")
+
+    if args.rate:
+        levels = [("rate", r) for r in parse_levels(args.rate, float)]
+    else:
+        levels = [("concurrency", c) for c in parse_levels(args.concurrency, int)]
+
+    rng = random.Random(args.seed)
+    rows = []
+    results = {"url": url, "levels": []}
+    try:
+        for kind, value in levels:
+            label = f"c={value}" if kind == "concurrency" else f"{value:g}/s"
+            sampler = MemorySampler(pid) if pid else None
+            if sampler:
+                sampler.start()
+
+            start = time.perf_counter()
+            if kind == "concurrency":
+                outcomes = run_closed_loop(url, samples, value, args.requests, rng, args.stream)
+            else:
+                outcomes = run_open_loop(url, samples, value, args.requests, rng, args.stream)
+            elapsed = time.perf_counter() - start
+
+            memory = []
+            if sampler:
+                sampler.stop()
+                memory = sampler.samples
+
+            row = summarize_level(label, outcomes, elapsed, memory)
+            rows.append(row)
+            results["levels"].append({"summary": row, "requests": outcomes, "memory": memory})
+            print(f"{label}: {row['ok']}/{row['requests']} ok in {elapsed:.1f}s")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print()
+    print_capacity_curve(rows)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
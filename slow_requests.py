@@ -0,0 +1,283 @@
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import image_processing
+
+# ------ CONFIGURATION PARAMETERS - MODIFY THESE VALUES AS NEEDED ------
+# The recorder is off unless SLOW_REQUEST_DIR points at a writable directory
+RECORD_DIR = os.environ.get("SLOW_REQUEST_DIR", "")
+THRESHOLD_SECONDS = float(os.environ.get("SLOW_REQUEST_THRESHOLD", 5))  # Record requests slower than this
+MAX_ENTRIES = int(os.environ.get("SLOW_REQUEST_MAX_ENTRIES", 50))       # Oldest recordings are removed beyond this
+PROFILE_TOP = 25                                                        # Functions shown in the replay profile
+# -------------------------------------------------------------------
+
+INPUT_FILE = "input.bin"
+TRACE_FILE = "trace.json"
+
+
+def enabled():
+    """Check whether slow requests are being recorded."""
+    return bool(RECORD_DIR)
+
+
+def decode_upload(file_bytes):
+    """
+    Decode uploaded image bytes the same way /process_image does.
+
+    Args:
+        file_bytes (bytes): Encoded image
+
+    Returns:
+        numpy.ndarray: RGB image
+    """
+    image_bgr = cv2.imdecode(np.frombuffer(file_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if image_bgr is None:
+        raise ValueError("Could not decode image")
+    return cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+
+
+def pipeline_parameters():
+    """
+    Collect the configuration constants of image_processing that affect the analysis.
+
+    Returns:
+        dict: Parameter name to JSON-compatible value
+    """
+    params = {}
+    for name, value in vars(image_processing).items():
+        if name.isupper() and isinstance(value, (bool, int, float, str, tuple)):
+            params[name] = list(value) if isinstance(value, tuple) else value
+    return params
+
+
+def record(file_bytes, filename, latency, trace, suture_analysis, budget=None, record_dir=None,
+           max_entries=None):
+    """
+    Store a request as a replayable recording in the ring buffer.
+
+    Args:
+        file_bytes (bytes): Uploaded image exactly as received
+        filename (str): Uploaded file name
+        latency (float): End-to-end latency of the request in seconds
+        trace (PipelineTrace): Stage timings and counts of the request
+        suture_analysis (Mapping): Analysis returned to the client
+        budget (float, optional): Latency budget the request ran under
+        record_dir (str, optional): Ring buffer directory (default: RECORD_DIR)
+        max_entries (int, optional): Recordings kept (default: MAX_ENTRIES)
+
+    Returns:
+        str: Path of the new recording
+    """
+    record_dir = record_dir or RECORD_DIR
+    max_entries = max_entries or MAX_ENTRIES
+    os.makedirs(record_dir, exist_ok=True)
+
+    # Names sort chronologically, which prune() relies on
+    now = time.time()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+    name = f"{stamp}.{int(now * 1000) % 1000:03d}-{uuid.uuid4().hex[:8]}"
+    entry = {
+        "recorded_at": now,
+        "filename": filename,
+        "latency_seconds": latency,
+        "budget_seconds": budget,
+        "processing_scale": suture_analysis.get("processing_scale", 1.0),
+        "degraded": bool(suture_analysis.get("degraded", False)),
+        "parameters": pipeline_parameters(),
+        "trace": trace.to_dict(),
+        "analysis": {key: suture_analysis[key] for key in suture_analysis
+                     if key != "individual_sutures"},
+    }
+
+    # Write into a hidden directory first so readers never see half a recording
+    staging = os.path.join(record_dir, f".{name}")
+    os.makedirs(staging)
+    with open(os.path.join(staging, INPUT_FILE), "wb") as f:
+        f.write(file_bytes)
+    with open(os.path.join(staging, TRACE_FILE), "w") as f:
+        json.dump(entry, f, indent=2)
+    path = os.path.join(record_dir, name)
+    os.rename(staging, path)
+
+    prune(record_dir, max_entries)
+    return path
+
+
+def list_recordings(record_dir=None):
+    """
+    List recordings in the ring buffer, oldest first.
+
+    Args:
+        record_dir (str, optional): Ring buffer directory (default: RECORD_DIR)
+
+    Returns:
+        list: Paths of the recordings
+    """
+    record_dir = record_dir or RECORD_DIR
+    if not record_dir or not os.path.isdir(record_dir):
+        return []
+    names = sorted(name for name in os.listdir(record_dir)
+                   if not name.startswith(".") and os.path.isfile(os.path.join(record_dir, name, TRACE_FILE)))
+    return [os.path.join(record_dir, name) for name in names]
+
+
+def prune(record_dir, max_entries):
+    """Remove the oldest recordings beyond max_entries."""
+    recordings = list_recordings(record_dir)
+    for path in recordings[:max(0, len(recordings) - max_entries)]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+# Single writer thread: recordings leave the request path and prune() never races itself
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-request-recorder")
+
+
+def _record_quietly(file_bytes, filename, latency, trace, suture_analysis, budget):
+    try:
+        path = record(file_bytes, filename, latency, trace, suture_analysis, budget=budget)
+    except Exception as e:
+        print(f"Could not record slow request: {e!r}")
+        return None
+    print(f"Recorded slow request ({latency:.2f}s) to {path}")
+    return path
+
+
+def maybe_record(file_bytes, filename, latency, trace, suture_analysis, budget=None):
+    """
+    Record the request in the background if the recorder is enabled and the request was slow.
+
+    The recording is written on a separate thread, so the disk I/O stays out of the
+    request, and any failure is reported and swallowed so the recorder never breaks one.
+
+    Returns:
+        concurrent.futures.Future: Resolves to the path of the new recording (None on failure),
+            or None if the request is not recorded
+    """
+    if not enabled() or latency < THRESHOLD_SECONDS:
+        return None
+    try:
+        return _writer.submit(_record_quietly, file_bytes, filename, latency, trace, suture_analysis, budget)
+    except RuntimeError as e:
+        # The executor refuses new work while the interpreter shuts down
+        print(f"Could not record slow request: {e!r}")
+        return None
+
+
+def load_recording(path):
+    """
+    Read a recording.
+
+    Args:
+        path (str): Recording directory
+
+    Returns:
+        tuple: (file_bytes, entry)
+    """
+    with open(os.path.join(path, INPUT_FILE), "rb") as f:
+        file_bytes = f.read()
+    with open(os.path.join(path, TRACE_FILE)) as f:
+        entry = json.load(f)
+    return file_bytes, entry
+
+
+def replay(path, profile_top=PROFILE_TOP):
+    """
+    Re-run the pipeline on a recording under cProfile and compare it with the recorded trace.
+
+    The recorded processing scale is reused so the same resolution is analysed; the
+    budget only chose that scale, so it is not re-applied.
+
+    Args:
+        path (str): Recording directory
+        profile_top (int): Functions shown in the profile, by cumulative time
+
+    Returns:
+        tuple: (PipelineTrace, SutureAnalysis) of the replay
+    """
+    file_bytes, entry = load_recording(path)
+    print(f"Replaying {entry['filename']} recorded at "
+          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['recorded_at']))} "
+          f"({entry['latency_seconds']:.2f}s, scale {entry['processing_scale']})")
+
+    current = pipeline_parameters()
+    for name, value in entry["parameters"].items():
+        if current.get(name) != value:
+            print(f"Warning: {name} was {value!r} when recorded, now {current.get(name)!r}")
+
+    trace = image_processing.PipelineTrace()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    image = decode_upload(file_bytes)
+    trace.mark("decode")
+    _, _, suture_analysis = image_processing.analyze_image(image, trace=trace, scale=entry["processing_scale"])
+    profiler.disable()
+
+    recorded_stages = dict(entry["trace"]["stages"])
+    print(f"\n{'stage':>28} {'recorded s':>11} {'replay s':>9}")
+    for stage, seconds in trace.stages:
+        recorded = recorded_stages.get(stage)
+        recorded = f"{recorded:.3f}" if recorded is not None else "-"
+        print(f"{stage:>28} {recorded:>11} {seconds:>9.3f}")
+
+    recorded_counts = entry["trace"]["counts"]
+    print(f"\n{'count':>28} {'recorded':>11} {'replay':>9}")
+    for name in dict.fromkeys(list(recorded_counts) + list(trace.counts)):
+        print(f"{name:>28} {recorded_counts.get(name, '-'):>11} {trace.counts.get(name, '-'):>9}")
+
+    print()
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(profile_top)
+    return trace, suture_analysis
+
+
+def _resolve(entry, record_dir):
+    """Accept a recording path, a recording name, or 'latest'."""
+    if os.path.isdir(entry):
+        return entry
+    recordings = list_recordings(record_dir)
+    if entry == "latest":
+        if not recordings:
+            raise SystemExit(f"No recordings in {record_dir}")
+        return recordings[-1]
+    path = os.path.join(record_dir, entry)
+    if not os.path.isdir(path):
+        raise SystemExit(f"No recording {entry} in {record_dir}")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and replay slow /process_image requests.")
+    parser.add_argument("--dir", default=RECORD_DIR or "slow_requests",
+                        help="Recording directory (default: $SLOW_REQUEST_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="Show the recorded requests")
+
+    replaying = commands.add_parser("replay", help="Re-run the pipeline on a recording with profiling")
+    replaying.add_argument("entry", nargs="?", default="latest", help="Recording name or path (default: latest)")
+    replaying.add_argument("--top", type=int, default=PROFILE_TOP, help="Profiled functions to show")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for path in list_recordings(args.dir):
+            _, entry = load_recording(path)
+            slowest = max(entry["trace"]["stages"], key=lambda stage: stage[1], default=("-", 0))
+            print(f"{os.path.basename(path)} {entry['latency_seconds']:>7.2f}s "
+                  f"scale {entry['processing_scale']:<5} slowest {slowest[0]} ({slowest[1]:.2f}s) "
+                  f"{entry['filename']}")
+    elif args.command == "replay":
+        replay(_resolve(args.entry, args.dir), profile_top=args.top)
+
+
+if __name__ == "__main__":
+    main()
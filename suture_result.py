@@ -0,0 +1,262 @@
+import json
+import math
+import struct
+from collections.abc import Mapping
+
+import numpy as np
+
+# Summary fields in the order they appear in the JSON output
+SUMMARY_FIELDS = (
+    "parallelism",
+    "even_spacing",
+    "sutures_detected",
+    "mean_angle",
+    "mean_distance",
+    "spacing_threshold",
+)
+
+# Fields added by extract_suture_mask after the quality analysis
+EXTRA_FIELDS = (
+    "total_lines_detected",
+    "best_lines_detected",
+    "filtered_lines_detected",
+    "degraded",
+    "processing_scale",
+)
+
+# Binary layout: magic, suture count, summary length, summary JSON, then the columns
+BINARY_MAGIC = b"SUA1"
+_HEADER = struct.Struct("<4sII")
+_FLAG_PARALLEL = 1
+_FLAG_EVEN_SPACING = 2
+_FLAG_OVERALL_GOOD = 4
+
+
+def _native(value):
+    """Convert a NumPy scalar to the equivalent Python scalar."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _json_floats(column):
+    """Format a float column the way json.dumps formats each value."""
+    return [repr(value) if math.isfinite(value) else json.dumps(value) for value in column.tolist()]
+
+
+def _json_bools(column):
+    """Format a boolean column as JSON literals."""
+    return ["true" if value else "false" for value in column.tolist()]
+
+
+class SutureAnalysis(Mapping):
+    """
+    Result of analyze_suture_quality with the per-suture fields stored as columns.
+
+    Behaves like the read-only dict the pipeline used to return (``"error" in
+    analysis``, ``analysis["individual_sutures"]``, ``analysis.get(...)``), and
+    accepts item assignment for the summary fields. Serialize it with
+    to_json_bytes() or to_bytes() instead of walking it with a sanitizer.
+
+    Args:
+        summary (dict): Summary fields (see SUMMARY_FIELDS and EXTRA_FIELDS)
+        lines (numpy.ndarray): (n, 4) array of x1, y1, x2, y2
+        angle (numpy.ndarray): Line angles in degrees
+        angle_deviation (numpy.ndarray): Absolute deviation from the mean angle
+        is_parallel (numpy.ndarray): Boolean parallelism flags
+        distance_deviation (numpy.ndarray): Spacing deviation, NaN where not evaluated
+        even_spacing (numpy.ndarray): Boolean spacing flags (ignored where distance_deviation is NaN)
+        overall_good (numpy.ndarray): Boolean overall quality flags
+        error (str, optional): Error message; set for results without sutures
+    """
+
+    __slots__ = ("error", "summary", "lines", "angle", "angle_deviation", "is_parallel",
+                 "distance_deviation", "even_spacing", "overall_good")
+
+    def __init__(self, summary, lines, angle, angle_deviation, is_parallel,
+                 distance_deviation, even_spacing, overall_good, error=None):
+        self.error = error
+        self.summary = {key: _native(value) for key, value in summary.items()}
+        self.lines = np.asarray(lines, dtype=np.int32).reshape(-1, 4)
+        self.angle = np.asarray(angle, dtype=np.float64)
+        self.angle_deviation = np.asarray(angle_deviation, dtype=np.float64)
+        self.is_parallel = np.asarray(is_parallel, dtype=bool)
+        self.distance_deviation = np.asarray(distance_deviation, dtype=np.float64)
+        self.even_spacing = np.asarray(even_spacing, dtype=bool)
+        self.overall_good = np.asarray(overall_good, dtype=bool)
+
+    @classmethod
+    def failure(cls, error, sutures_detected):
+        """Create a result for an analysis that could not be completed."""
+        empty = np.zeros(0)
+        return cls({"sutures_detected": sutures_detected}, np.zeros((0, 4)), empty, empty,
+                   empty, empty, empty, empty, error=error)
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, key):
+        if key == "error":
+            return self.error is not None
+        if key == "individual_sutures":
+            return self.error is None
+        return key in self.summary
+
+    def keys(self):
+        if self.error is not None:
+            return ["error"] + list(self.summary)
+        keys = [key for key in SUMMARY_FIELDS if key in self.summary]
+        keys.append("individual_sutures")
+        keys.extend(key for key in self.summary if key not in SUMMARY_FIELDS)
+        return keys
+
+    def __getitem__(self, key):
+        if key == "error" and self.error is not None:
+            return self.error
+        if key == "individual_sutures" and self.error is None:
+            return self._suture_records()
+        return self.summary[key]
+
+    def __setitem__(self, key, value):
+        if key in ("error", "individual_sutures"):
+            raise KeyError(f"{key} cannot be assigned")
+        self.summary[key] = _native(value)
+
+    def __repr__(self):
+        return f"SutureAnalysis({self.to_dict()!r})"
+
+    def _suture_records(self):
+        """Build the per-suture dicts from the columns in one pass."""
+        lines = self.lines.tolist()
+        angles = self.angle.tolist()
+        deviations = self.angle_deviation.tolist()
+        parallel = self.is_parallel.tolist()
+        distance_deviations = self.distance_deviation.tolist()
+        even_spacing = self.even_spacing.tolist()
+        overall_good = self.overall_good.tolist()
+
+        records = []
+        for i, (x1, y1, x2, y2) in enumerate(lines):
+            record = {
+                "line": ((x1, y1), (x2, y2)),
+                "angle": angles[i],
+                "angle_deviation": deviations[i],
+                "is_parallel": parallel[i],
+            }
+            # NaN marks sutures whose spacing was not evaluated (the first one)
+            if distance_deviations[i] == distance_deviations[i]:
+                record["distance_deviation"] = distance_deviations[i]
+                record["even_spacing"] = even_spacing[i]
+            record["overall_good"] = overall_good[i]
+            records.append(record)
+        return records
+
+    def to_dict(self):
+        """
+        Convert to plain Python types, in the same layout as the original dict result.
+
+        Returns:
+            dict: JSON-compatible analysis
+        """
+        return {key: self[key] for key in self.keys()}
+
+    def _sutures_json(self):
+        """Write the individual_sutures JSON array straight from the columns."""
+        lines = self.lines.tolist()
+        angles = _json_floats(self.angle)
+        deviations = _json_floats(self.angle_deviation)
+        parallel = _json_bools(self.is_parallel)
+        distances = _json_floats(self.distance_deviation)
+        even_spacing = _json_bools(self.even_spacing)
+        overall_good = _json_bools(self.overall_good)
+        # NaN marks sutures whose spacing was not evaluated (the first one)
+        evaluated = (self.distance_deviation == self.distance_deviation).tolist()
+
+        items = []
+        for i, (x1, y1, x2, y2) in enumerate(lines):
+            spacing = (f'"distance_deviation":{distances[i]},"even_spacing":{even_spacing[i]},'
+                       if evaluated[i] else "")
+            items.append(f'{{"line":[[{x1},{y1}],[{x2},{y2}]],"angle":{angles[i]},'
+                         f'"angle_deviation":{deviations[i]},"is_parallel":{parallel[i]},'
+                         f'{spacing}"overall_good":{overall_good[i]}}}')
+        return "[" + ",".join(items) + "]"
+
+    def to_json_bytes(self):
+        """
+        Serialize to compact UTF-8 JSON in one pass over the columns, without building the per-suture dicts.
+
+        Returns:
+            bytes: JSON document (the same as json.dumps(self.to_dict()) with compact separators)
+        """
+        separators = (",", ":")
+        if self.error is not None:
+            return json.dumps({"error": self.error, **self.summary}, separators=separators).encode("utf-8")
+
+        # The sutures array sits between the core summary fields and the extra ones
+        head = {key: self.summary[key] for key in SUMMARY_FIELDS if key in self.summary}
+        tail = {key: value for key, value in self.summary.items() if key not in SUMMARY_FIELDS}
+        fields = [json.dumps(head, separators=separators)[1:-1],
+                  '"individual_sutures":' + self._sutures_json(),
+                  json.dumps(tail, separators=separators)[1:-1]]
+        return ("{" + ",".join(field for field in fields if field) + "}").encode("utf-8")
+
+    def to_bytes(self):
+        """
+        Serialize to the compact binary format (summary as JSON, sutures as raw columns).
+
+        Returns:
+            bytes: Binary document readable by from_bytes
+        """
+        summary = dict(self.summary)
+        if self.error is not None:
+            summary["error"] = self.error
+        summary_bytes = json.dumps(summary, separators=(",", ":")).encode("utf-8")
+
+        flags = (self.is_parallel * _FLAG_PARALLEL
+                 | self.even_spacing * _FLAG_EVEN_SPACING
+                 | self.overall_good * _FLAG_OVERALL_GOOD).astype(np.uint8)
+        return b"".join([
+            _HEADER.pack(BINARY_MAGIC, len(self.lines), len(summary_bytes)),
+            summary_bytes,
+            self.lines.astype("<i4").tobytes(),
+            self.angle.astype("<f8").tobytes(),
+            self.angle_deviation.astype("<f8").tobytes(),
+            self.distance_deviation.astype("<f8").tobytes(),
+            flags.tobytes(),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Read a result written by to_bytes.
+
+        Args:
+            data (bytes): Binary document
+
+        Returns:
+            SutureAnalysis: Decoded result
+        """
+        magic, count, summary_length = _HEADER.unpack_from(data)
+        if magic != BINARY_MAGIC:
+            raise ValueError("Not a suture analysis document")
+
+        offset = _HEADER.size
+        summary = json.loads(data[offset:offset + summary_length])
+        offset += summary_length
+        error = summary.pop("error", None)
+
+        def column(dtype, width=1):
+            nonlocal offset
+            array = np.frombuffer(data, dtype=dtype, count=count * width, offset=offset)
+            offset += array.nbytes
+            return array
+
+        lines = column("<i4", 4)
+        angle = column("<f8")
+        angle_deviation = column("<f8")
+        distance_deviation = column("<f8")
+        flags = column(np.uint8)
+        return cls(summary, lines, angle, angle_deviation, flags & _FLAG_PARALLEL,
+                   distance_deviation, flags & _FLAG_EVEN_SPACING, flags & _FLAG_OVERALL_GOOD,
+                   error=error)